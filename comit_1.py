@@ -5,13 +5,95 @@
 """
 
 import argparse
+import array
+import functools
 import sys
 import os
 
 
+def _build_csr(adjacency):
+    """Преобразование словаря смежности в CSR-представление (массивы номеров вершин).
+
+    Возвращает (имена, {имя: номер}, offsets, edges): потомки вершины i -
+    edges[offsets[i]:offsets[i + 1]]."""
+    names = list(adjacency)
+    for children in adjacency.values():
+        names.extend(child for child in children if child not in adjacency and child not in names)
+    index = {name: i for i, name in enumerate(names)}
+
+    offsets = array.array('i', [0])
+    edges = array.array('i')
+    for name in names:
+        edges.extend(index[child] for child in adjacency.get(name, ()))
+        offsets.append(len(edges))
+
+    return tuple(names), index, offsets, edges
+
+
+@functools.lru_cache(maxsize=32)
+def _filter_mask(names, filter_str):
+    """Маска пакетов, проходящих фильтр: allowed[i] == 1, если names[i] содержит filter_str.
+
+    Результат кэшируется для пары (имена, фильтр) и не должен изменяться вызывающим кодом."""
+    if not filter_str:
+        return bytes([1]) * len(names)
+    return bytes(filter_str in name for name in names)
+
+
+def _traverse_csr(offsets, edges, allowed, root, max_depth):
+    """Обход в глубину по CSR-графу (только целочисленные массивы).
+
+    Возвращает массивы (order, depths) в порядке вывода дерева; номер -1 в order
+    означает циклическую зависимость. allowed[i] == 0 исключает пакет i из обхода."""
+    n = len(offsets) - 1
+    order = array.array('i')
+    depths = array.array('i')
+    visited = bytearray(n)
+    on_path = bytearray(n)
+    path = array.array('i')  # path[d] - пакет на глубине d текущей ветви
+    stack = [(root, 0)]
+
+    while stack:
+        node, depth = stack.pop()
+        while len(path) > depth:
+            on_path[path.pop()] = 0
+
+        if on_path[node]:
+            order.append(-1)
+            depths.append(depth)
+            continue
+
+        if visited[node]:
+            continue
+
+        visited[node] = 1
+        on_path[node] = 1
+        path.append(node)
+        order.append(node)
+        depths.append(depth)
+
+        if depth < max_depth:
+            for i in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                child = edges[i]
+                if allowed[child]:
+                    stack.append((child, depth + 1))
+
+    return order, depths
+
+
 class DependencyVisualizer:
     """Основной класс для визуализации графа зависимостей"""
 
+    # Простой пример графа зависимостей для симуляции анализа
+    _SAMPLE_NAMES, _SAMPLE_INDEX, _SAMPLE_OFFSETS, _SAMPLE_EDGES = _build_csr({
+        'requests': ('urllib3', 'chardet', 'certifi'),
+        'urllib3': ('brotli', 'pyOpenSSL'),
+        'chardet': (),
+        'certifi': (),
+        'brotli': (),
+        'pyOpenSSL': ('cryptography',)
+    })
+
     def __init__(self):
         self.config = None
 
@@ -212,30 +294,31 @@ class DependencyVisualizer:
 
     def demonstrate_analysis_capabilities(self, config):
         """Демонстрация возможностей анализа на основе конфигурации"""
-        print("\n" + "=" * 50)
-        print("ДЕМОНСТРАЦИЯ ВОЗМОЖНОСТЕЙ АНАЛИЗА")
-        print("=" * 50)
+        lines = ["\n" + "=" * 50, "ДЕМОНСТРАЦИЯ ВОЗМОЖНОСТЕЙ АНАЛИЗА", "=" * 50]
 
-        print(f"Анализируем пакет: {config.package_name}")
-        print(f"Режим работы: {config.work_mode}")
+        lines.append(f"Анализируем пакет: {config.package_name}")
+        lines.append(f"Режим работы: {config.work_mode}")
 
         if config.work_mode == 'online':
-            print(f"Источник данных: онлайн репозиторий ({config.repository_url})")
+            lines.append(f"Источник данных: онлайн репозиторий ({config.repository_url})")
         else:
-            print(f"Источник данных: локальный репозиторий ({config.test_repo_path})")
+            lines.append(f"Источник данных: локальный репозиторий ({config.test_repo_path})")
 
         if config.max_depth:
-            print(f"Ограничение глубины анализа: {config.max_depth} уровней")
+            lines.append(f"Ограничение глубины анализа: {config.max_depth} уровней")
         else:
-            print("Глубина анализа: неограничена")
+            lines.append("Глубина анализа: неограничена")
 
         if config.filter_substring:
-            print(f"Фильтрация пакетов: будут показаны только пакеты, содержащие '{config.filter_substring}'")
+            lines.append(f"Фильтрация пакетов: будут показаны только пакеты, содержащие '{config.filter_substring}'")
         else:
-            print("Фильтрация пакетов: не применяется")
+            lines.append("Фильтрация пакетов: не применяется")
+
+        lines.append("\nГотов к построению графа зависимостей...")
+        lines.append("(Эта функциональность будет реализована на следующих этапах)\n")
 
-        print("\nГотов к построению графа зависимостей...")
-        print("(Эта функциональность будет реализована на следующих этапах)")
+        # Весь блок выводится одной записью вместо print на каждую строку
+        sys.stdout.write("\n".join(lines))
 
     def run(self):
         """Основной метод запуска приложения"""
@@ -271,51 +354,33 @@ class DependencyVisualizer:
 
     def simulate_dependency_analysis(self):
         """Симуляция анализа зависимостей для демонстрации"""
-        # Простой пример графа зависимостей
-        sample_dependencies = {
-            'requests': ['urllib3', 'chardet', 'certifi'],
-            'urllib3': ['brotli', 'pyOpenSSL'],
-            'chardet': [],
-            'certifi': [],
-            'brotli': [],
-            'pyOpenSSL': ['cryptography']
-        }
-
         current_package = self.config.package_name
         max_depth = self.config.max_depth or 3
         filter_str = self.config.filter_substring
+        names, offsets, edges = self._SAMPLE_NAMES, self._SAMPLE_OFFSETS, self._SAMPLE_EDGES
 
         print(f"\nСимуляция анализа зависимостей для '{current_package}':")
 
-        def analyze_deps(package, depth=0, visited=None):
-            if visited is None:
-                visited = set()
-
-            if depth > max_depth:
-                return []
-
-            if package in visited:
-                return ["(циклическая зависимость)"]
-
-            visited.add(package)
-
+        def analyze_deps(root):
             # Применяем фильтрацию
-            if filter_str and filter_str not in package:
+            if filter_str and filter_str not in root:
                 return []
 
-            deps = sample_dependencies.get(package, [])
-            result = [f"{'  ' * depth}├── {package}"]
+            root_id = self._SAMPLE_INDEX.get(root)
+            if root_id is None:
+                return [f"├── {root}"]
 
-            for dep in deps:
-                result.extend(analyze_deps(dep, depth + 1, visited.copy()))
+            # Фильтр проверяется один раз на пакет, дальше обход идёт только по номерам
+            allowed = _filter_mask(names, filter_str)
+            order, depths = _traverse_csr(offsets, edges, allowed, root_id, max_depth)
 
-            return result
+            return [f"{'  ' * depth}├── {names[node]}" if node >= 0 else "(циклическая зависимость)"
+                    for node, depth in zip(order, depths)]
 
         try:
             tree = analyze_deps(current_package)
             if tree:
-                for line in tree:
-                    print(line)
+                sys.stdout.write("\n".join(tree) + "\n")
             else:
                 print("  (зависимости не найдены или отфильтрованы)")
         except KeyError:
@@ -4,13 +4,20 @@
 Этап 2: Сбор данных для NuGet пакетов
 """
 
-import argparse
+import functools
+import io
 import sys
-import os
-import xml.etree.ElementTree as ET
-from urllib.request import urlopen, Request
-from urllib.error import HTTPError, URLError
-import json
+
+# xml, http/urllib и json импортируются лениво внутри методов NuGetClient:
+# для --help и ошибок конфигурации они не нужны
+
+_URL_SCHEMES = ('http://', 'https://')
+_WORK_MODES = ('online', 'offline')  # кортеж, а не множество: порядок важен для --help
+
+
+def _is_non_empty_str(value):
+    """Проверка, что значение - непустая строка"""
+    return isinstance(value, str) and bool(value.strip())
 
 
 class DependencyVisualizer:
@@ -23,6 +30,10 @@ class DependencyVisualizer:
     class Config:
         """Класс для хранения и валидации конфигурационных параметров"""
 
+        # Без __dict__ у экземпляров: меньше памяти и быстрее доступ к атрибутам
+        __slots__ = ('package_name', 'repository_url', 'test_repo_path', 'work_mode', 'max_depth',
+                     'filter_substring')
+
         def __init__(self):
             self.package_name = None
             self.repository_url = None
@@ -31,38 +42,49 @@ class DependencyVisualizer:
             self.max_depth = None
             self.filter_substring = None
 
-        def validate(self):
-            """Валидация параметров конфигурации"""
-            errors = []
-
+        # Правила валидации: (получение значения, проверка корректности, сообщение об ошибке).
+        # Порядок правил определяет порядок сообщений об ошибках
+        _VALIDATORS = (
             # Проверка обязательных параметров
-            if not self.package_name:
-                errors.append("Имя пакета обязательно для указания")
-            elif not isinstance(self.package_name, str) or not self.package_name.strip():
-                errors.append("Имя пакета должно быть непустой строкой")
-
-            if not self.repository_url and not self.test_repo_path:
-                errors.append("Необходимо указать либо URL репозитория, либо путь к тестовому репозиторию")
-
-            if self.repository_url and self.test_repo_path:
-                errors.append("Можно указать только один источник: URL репозитория ИЛИ путь к тестовому репозиторию")
+            (lambda c: c.package_name, bool,
+             "Имя пакета обязательно для указания"),
+            (lambda c: c.package_name, lambda v: not v or _is_non_empty_str(v),
+             "Имя пакета должно быть непустой строкой"),
+            (lambda c: (c.repository_url, c.test_repo_path), any,
+             "Необходимо указать либо URL репозитория, либо путь к тестовому репозиторию"),
+            (lambda c: (c.repository_url, c.test_repo_path), lambda v: not all(v),
+             "Можно указать только один источник: URL репозитория ИЛИ путь к тестовому репозиторию"),
 
             # Валидация URL
-            if self.repository_url:
-                if not isinstance(self.repository_url, str) or not self.repository_url.strip():
-                    errors.append("URL репозитория должен быть непустой строкой")
-                elif not (self.repository_url.startswith('http://') or self.repository_url.startswith('https://')):
-                    errors.append("URL репозитория должен начинаться с http:// или https://")
+            (lambda c: c.repository_url, lambda v: not v or _is_non_empty_str(v),
+             "URL репозитория должен быть непустой строкой"),
+            (lambda c: c.repository_url, lambda v: not _is_non_empty_str(v) or v.startswith(_URL_SCHEMES),
+             "URL репозитория должен начинаться с http:// или https://"),
 
             # Валидация пути к тестовому репозиторию
-            if self.test_repo_path:
-                if not isinstance(self.test_repo_path, str) or not self.test_repo_path.strip():
-                    errors.append("Путь к тестовому репозиторию должен быть непустой строкой")
+            (lambda c: c.test_repo_path, lambda v: not v or _is_non_empty_str(v),
+             "Путь к тестовому репозиторию должен быть непустой строкой"),
 
             # Проверка режима работы
-            if self.work_mode and self.work_mode not in ['online', 'offline']:
-                errors.append("Режим работы должен быть 'online' или 'offline'")
+            (lambda c: c.work_mode, lambda v: not v or v in _WORK_MODES,
+             "Режим работы должен быть 'online' или 'offline'"),
 
+            # Проверка максимальной глубины
+            (lambda c: c.max_depth, lambda v: v is None or isinstance(v, int),
+             "Максимальная глубина должна быть целым числом"),
+            (lambda c: c.max_depth, lambda v: not isinstance(v, int) or v >= 1,
+             "Максимальная глубина должна быть положительным числом"),
+
+            # Проверка существования тестового репозитория в offline режиме
+            (lambda c: c.check_test_repo(), lambda v: v is None, "{}"),
+
+            # Валидация подстроки фильтрации
+            (lambda c: c.filter_substring, lambda v: v is None or isinstance(v, str),
+             "Подстрока для фильтрации должна быть строкой"),
+        )
+
+        def validate(self):
+            """Валидация параметров конфигурации"""
             # Автоматическое определение режима, если не указан
             if self.work_mode is None:
                 if self.repository_url:
@@ -70,50 +92,75 @@ class DependencyVisualizer:
                 elif self.test_repo_path:
                     self.work_mode = 'offline'
 
-            # Проверка максимальной глубины
-            if self.max_depth is not None:
-                if not isinstance(self.max_depth, int):
-                    try:
-                        self.max_depth = int(self.max_depth)
-                    except (ValueError, TypeError):
-                        errors.append("Максимальная глубина должна быть целым числом")
+            # Приведение максимальной глубины к целому числу
+            if self.max_depth is not None and not isinstance(self.max_depth, int):
+                try:
+                    self.max_depth = int(self.max_depth)
+                except (ValueError, TypeError):
+                    pass
 
-                if isinstance(self.max_depth, int) and self.max_depth < 1:
-                    errors.append("Максимальная глубина должна быть положительным числом")
+            return list(_validate_tuple(*self.as_tuple(), self.test_repo_mtime()))
 
-            # Проверка существования тестового репозитория в offline режиме
-            if self.work_mode == 'offline' and self.test_repo_path:
-                if not os.path.exists(self.test_repo_path):
-                    errors.append(f"Тестовый репозиторий не найден: {self.test_repo_path}")
-                elif not os.path.isdir(self.test_repo_path):
-                    errors.append(f"Путь к тестовому репозиторию должен быть директорией: {self.test_repo_path}")
+        def as_tuple(self):
+            """Значения параметров в порядке __slots__"""
+            return tuple(getattr(self, name) for name in self.__slots__)
 
-            # Валидация подстроки фильтрации
-            if self.filter_substring is not None:
-                if not isinstance(self.filter_substring, str):
-                    errors.append("Подстрока для фильтрации должна быть строкой")
+        def collect_errors(self):
+            """Применение правил валидации к текущим значениям параметров"""
+            return [message.format(value)
+                    for getter, is_valid, message in self._VALIDATORS
+                    if not is_valid(value := getter(self))]
 
-            return errors
+        def test_repo_mtime(self):
+            """Время изменения тестового репозитория (для ключа кэша валидации)"""
+            if self.work_mode != 'offline' or not self.test_repo_path:
+                return None
 
-        def __str__(self):
-            """Строковое представление конфигурации в формате ключ-значение"""
-            config_items = [
-                ("package_name", "Имя анализируемого пакета", self.package_name),
-                ("repository_url", "URL репозитория", self.repository_url),
-                ("test_repo_path", "Путь к тестовому репозиторию", self.test_repo_path),
-                ("work_mode", "Режим работы", self.work_mode),
-                ("max_depth", "Максимальная глубина анализа", self.max_depth),
-                ("filter_substring", "Подстрока для фильтрации", self.filter_substring)
-            ]
+            import os
+
+            try:
+                return os.stat(self.test_repo_path).st_mtime
+            except (OSError, ValueError):
+                return None
+
+        def check_test_repo(self):
+            """Проверка тестового репозитория одним вызовом os.stat (None, если ошибок нет)"""
+            if self.work_mode != 'offline' or not self.test_repo_path:
+                return None
+
+            import os
+            import stat
 
-            result = "Текущая конфигурация:\n"
-            max_key_length = max(len(key) for _, key, _ in config_items)
+            try:
+                mode = os.stat(self.test_repo_path).st_mode
+            except (OSError, ValueError):
+                return f"Тестовый репозиторий не найден: {self.test_repo_path}"
+
+            if not stat.S_ISDIR(mode):
+                return f"Путь к тестовому репозиторию должен быть директорией: {self.test_repo_path}"
+
+            return None
+
+        # Поля для вывода в формате ключ-значение: (атрибут, подпись)
+        _CONFIG_FIELDS = (
+            ("package_name", "Имя анализируемого пакета"),
+            ("repository_url", "URL репозитория"),
+            ("test_repo_path", "Путь к тестовому репозиторию"),
+            ("work_mode", "Режим работы"),
+            ("max_depth", "Максимальная глубина анализа"),
+            ("filter_substring", "Подстрока для фильтрации")
+        )
+        _MAX_KEY_LEN = max(len(label) for _, label in _CONFIG_FIELDS)
+        _LINE_FORMAT = f"  {{:<{_MAX_KEY_LEN}}} : {{}}\n"
 
-            for _, key, value in config_items:
-                display_value = value if value is not None else 'не указано'
-                result += f"  {key:<{max_key_length}} : {display_value}\n"
+        def __str__(self):
+            """Строковое представление конфигурации в формате ключ-значение"""
+            parts = ["Текущая конфигурация:\n"]
+            for attr, label in self._CONFIG_FIELDS:
+                value = getattr(self, attr)
+                parts.append(self._LINE_FORMAT.format(label, value if value is not None else 'не указано'))
 
-            return result
+            return "".join(parts)
 
     class NuGetClient:
         """Клиент для работы с NuGet репозиторием"""
@@ -121,17 +168,88 @@ class DependencyVisualizer:
         def __init__(self, base_url):
             self.base_url = base_url.rstrip('/')
             self.services = {}
+            self._connections = {}  # (схема, хост) -> (постоянное соединение, через_http_прокси)
+
+        def _connect(self, parts):
+            """Новое соединение с хостом URL с учетом HTTP(S)_PROXY/NO_PROXY, как в urlopen.
+
+            Возвращает (соединение, через_http_прокси): HTTP-прокси ожидает в запросе полный URL."""
+            import http.client
+            from urllib.parse import urlsplit
+            from urllib.request import getproxies, proxy_bypass
+
+            proxy = getproxies().get(parts.scheme)
+            if not proxy or proxy_bypass(parts.hostname):
+                conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                return conn_class(parts.netloc), False
+
+            proxy_parts = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            if parts.scheme == 'https':
+                # HTTPS идет через туннель CONNECT, TLS устанавливается с самим хостом
+                conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_parts.port)
+                conn.set_tunnel(parts.netloc)
+                return conn, False
+            return http.client.HTTPConnection(proxy_parts.hostname, proxy_parts.port), True
+
+        def _request(self, url, headers=None, max_redirects=5):
+            """GET-запрос через постоянное (keep-alive) соединение, возвращает (ответ, тело)"""
+            from urllib.parse import urljoin, urlsplit
+
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.netloc)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            request_headers = {'User-Agent': 'DependencyVisualizer/1.0'}
+            if headers:
+                request_headers.update(headers)
+
+            for attempt in range(2):
+                if key not in self._connections:
+                    self._connections[key] = self._connect(parts)
+                conn, via_proxy = self._connections[key]
+
+                try:
+                    conn.request("GET", parts._replace(fragment='').geturl() if via_proxy else path,
+                                 headers=request_headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                    break
+                except Exception as e:
+                    conn.close()
+                    del self._connections[key]
+                    # Сервер мог закрыть простаивающее соединение - переподключаемся один раз
+                    if attempt or not isinstance(e, ConnectionError):
+                        raise
+
+            if response.status in (301, 302, 303, 307, 308) and max_redirects:
+                location = response.getheader('Location')
+                if location:
+                    return self._request(urljoin(url, location), headers, max_redirects - 1)
+
+            return response, data
+
+        def _get(self, url):
+            """GET-запрос, возвращает тело ответа"""
+            from urllib.error import HTTPError
+
+            response, data = self._request(url)
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+
+            return data
 
         def get_service_url(self, service_type="PackageBaseAddress/3.0.0"):
             """Получение URL сервиса из service index"""
+            import json
+
             try:
                 if not self.services:
                     # Получаем service index
                     service_index_url = f"{self.base_url}/index.json"
-                    request = Request(service_index_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
-
-                    with urlopen(request) as response:
-                        data = json.loads(response.read().decode())
+                    # json.loads принимает bytes напрямую (UTF-8 определяется сам), без промежуточной str
+                    data = json.loads(self._get(service_index_url))
 
                     # Кэшируем сервисы
                     for resource in data.get('resources', []):
@@ -143,16 +261,16 @@ class DependencyVisualizer:
 
         def get_package_versions(self, package_name):
             """Получение списка версий пакета"""
+            from urllib.error import HTTPError
+            import json
+
             try:
                 service_url = self.get_service_url()
                 if not service_url:
                     raise Exception("Не найден сервис PackageBaseAddress")
 
                 package_url = f"{service_url}{package_name.lower()}/index.json"
-                request = Request(package_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
-
-                with urlopen(request) as response:
-                    data = json.loads(response.read().decode())
+                data = json.loads(self._get(package_url))
 
                 return data.get('versions', [])
             except HTTPError as e:
@@ -165,6 +283,8 @@ class DependencyVisualizer:
 
         def get_package_dependencies(self, package_name, version=None):
             """Получение зависимостей пакета"""
+            from urllib.error import HTTPError
+
             try:
                 if not version:
                     versions = self.get_package_versions(package_name)
@@ -174,12 +294,9 @@ class DependencyVisualizer:
 
                 service_url = self.get_service_url()
                 nuspec_url = f"{service_url}{package_name.lower()}/{version}/{package_name.lower()}.nuspec"
-                request = Request(nuspec_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
-
-                with urlopen(request) as response:
-                    nuspec_content = response.read().decode()
+                nuspec_stream = io.BytesIO(self._get(nuspec_url))
 
-                return self.parse_nuspec_dependencies(nuspec_content)
+                return self.parse_nuspec_dependencies(nuspec_stream)
 
             except HTTPError as e:
                 if e.code == 404:
@@ -189,115 +306,144 @@ class DependencyVisualizer:
             except Exception as e:
                 raise Exception(f"Ошибка получения зависимостей: {e}")
 
-        def parse_nuspec_dependencies(self, nuspec_content):
-            """Парсинг зависимостей из .nuspec файла"""
+        def parse_nuspec_dependencies(self, nuspec_stream):
+            """Потоковый парсинг зависимостей из .nuspec (файлоподобный объект с байтами)"""
+            import xml.etree.ElementTree as ET
+
             try:
-                root = ET.fromstring(nuspec_content)
-
-                # Находим namespace
-                ns = {'ns': root.tag.split('}')[0].strip('{')} if '}' in root.tag else {'ns': ''}
-
-                # Ищем зависимости
-                dependencies = []
-                metadata = root.find('ns:metadata', ns) if ns['ns'] else root.find('metadata')
-
-                if metadata is not None:
-                    deps_element = metadata.find('ns:dependencies', ns) if ns['ns'] else metadata.find('dependencies')
-                    if deps_element is not None:
-                        for group in deps_element.findall('ns:group', ns) if ns['ns'] else deps_element.findall(
-                                'group'):
-                            for dep in group.findall('ns:dependency', ns) if ns['ns'] else group.findall('dependency'):
-                                dep_id = dep.get('id')
-                                if dep_id:
-                                    dependencies.append(dep_id)
-
-                        # Также проверяем зависимости без группы
-                        for dep in deps_element.findall('ns:dependency', ns) if ns['ns'] else deps_element.findall(
-                                'dependency'):
-                            dep_id = dep.get('id')
-                            if dep_id:
-                                dependencies.append(dep_id)
-
-                return list(set(dependencies))  # Убираем дубликаты
+                dependencies = set()  # Дубликаты (одна зависимость в разных группах) отсеиваются сразу
+                add_dependency = dependencies.add
+
+                # Элементы обрабатываются по мере чтения и сразу освобождаются;
+                # имя тега сравнивается без namespace
+                for _, elem in ET.iterparse(nuspec_stream, events=('end',)):
+                    tag = elem.tag.rsplit('}', 1)[-1]
+                    if tag == 'dependency':
+                        dep_id = elem.get('id')
+                        if dep_id:
+                            add_dependency(dep_id)
+                    elif tag == 'dependencies':
+                        # Блок зависимостей единственный: остаток документа не разбираем
+                        break
+                    elem.clear()
+
+                return sorted(dependencies)
 
             except ET.ParseError as e:
                 raise Exception(f"Ошибка парсинга .nuspec файла: {e}")
             except Exception as e:
                 raise Exception(f"Ошибка анализа зависимостей: {e}")
 
-    def parse_arguments(self):
-        """Парсинг аргументов командной строки"""
-        parser = argparse.ArgumentParser(
-            description='Инструмент визуализации графа зависимостей пакетов (NuGet)',
-            formatter_class=argparse.RawDescriptionHelpFormatter,
-            epilog='''
-Примеры использования:
-  python comit_1.py --package Newtonsoft.Json --url https://api.nuget.org/v3/index.json
-  python comit_1.py --package Newtonsoft.Json --url https://api.nuget.org/v3/index.json --max-depth 3
-  python comit_1.py --package Microsoft.Extensions.Logging --url https://api.nuget.org/v3/index.json --filter "Extensions"
+    class CachedNuGetClient(NuGetClient):
+        """Клиент NuGet с дисковым кэшем HTTP-ответов
 
-Обязательные параметры:
-  --package и --url должны быть указаны всегда.
-            '''
-        )
+        Ответы хранятся в $XDG_CACHE_HOME/dependency_visualizer/ под ключом SHA1(URL).
+        Service index и списки версий перепроверяются условным GET (ETag/Last-Modified),
+        .nuspec неизменяемы для пары (id, версия) и берутся из кэша без запросов.
+        В режиме offline сеть не используется вовсе."""
 
-        # Обязательные параметры
-        parser.add_argument(
-            '--package',
-            dest='package_name',
-            required=True,
-            type=str,
-            help='Имя анализируемого пакета NuGet (обязательно)'
-        )
+        def __init__(self, base_url, offline=False, cache_dir=None):
+            super().__init__(base_url)
+            self.offline = offline
+            self.cache_dir = cache_dir or self.default_cache_dir()
 
-        # Источники данных
-        parser.add_argument(
-            '--url',
-            dest='repository_url',
-            type=str,
-            required=True,
-            help='URL-адрес NuGet репозитория (например, https://api.nuget.org/v3/index.json)'
-        )
+        @staticmethod
+        def default_cache_dir():
+            """Каталог кэша по спецификации XDG"""
+            import os
 
-        # Опциональные параметры
-        parser.add_argument(
-            '--mode',
-            dest='work_mode',
-            choices=['online', 'offline'],
-            help='Режим работы: online (по умолчанию) или offline'
-        )
+            cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            return os.path.join(cache_home, 'dependency_visualizer')
 
-        parser.add_argument(
-            '--max-depth',
-            dest='max_depth',
-            type=int,
-            help='Максимальная глубина анализа зависимостей (положительное целое число)'
-        )
+        def _cache_paths(self, url):
+            """Пути к файлу тела ответа и файлу его метаданных"""
+            import hashlib
+            import os
 
-        parser.add_argument(
-            '--filter',
-            dest='filter_substring',
-            type=str,
-            help='Подстрока для фильтрации пакетов по имени'
-        )
+            base = os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest())
+            return base, base + '.meta.json'
+
+        def _read_cache(self, url):
+            """Чтение ответа из кэша: (тело, метаданные) или (None, None)"""
+            import json
+
+            body_path, meta_path = self._cache_paths(url)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                with open(body_path, 'rb') as f:
+                    return f.read(), meta
+            except (OSError, ValueError):
+                return None, None
+
+        def _write_cache(self, url, data, response):
+            """Атомарная запись ответа и его валидаторов (ETag/Last-Modified) в кэш"""
+            import json
+            import os
+
+            body_path, meta_path = self._cache_paths(url)
+            meta = {
+                'url': url,
+                'etag': response.getheader('ETag'),
+                'last_modified': response.getheader('Last-Modified'),
+            }
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for path, content, mode in ((body_path, data, 'wb'), (meta_path, json.dumps(meta), 'w')):
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, mode) as f:
+                        f.write(content)
+                    os.replace(tmp_path, path)
+            except OSError:
+                pass  # Кэш - оптимизация: ошибка записи не должна прерывать анализ
+
+        def _get(self, url):
+            """GET-запрос с использованием дискового кэша"""
+            from urllib.error import HTTPError
+
+            cached, meta = self._read_cache(url)
+
+            if cached is not None and (self.offline or url.endswith('.nuspec')):
+                return cached
+
+            if self.offline:
+                raise Exception(f"Ресурс {url} отсутствует в кэше ({self.cache_dir}); "
+                                f"выполните запуск в режиме online, чтобы загрузить его")
 
-        return parser.parse_args()
+            headers = {}
+            if cached is not None:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+
+            response, data = self._request(url, headers)
+
+            if response.status == 304 and cached is not None:
+                return cached
+
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+
+            self._write_cache(url, data, response)
+            return data
+
+    def parse_arguments(self):
+        """Парсинг аргументов командной строки прямо в объект Config"""
+        # argparse записывает значения (dest=...) в атрибуты переданного объекта,
+        # поэтому отдельный Namespace и копирование полей не нужны
+        return _build_parser().parse_args(namespace=self.Config())
 
     def create_config(self):
         """Создание и валидация конфигурации"""
         try:
-            args = self.parse_arguments()
+            config = self.parse_arguments()
         except SystemExit:
             # argparse уже вывел сообщение об ошибке
             sys.exit(1)
 
-        config = self.Config()
-        config.package_name = args.package_name
-        config.repository_url = args.repository_url
-        config.test_repo_path = None  # Для этого этапа не используется
-        config.work_mode = args.work_mode or 'online'
-        config.max_depth = args.max_depth
-        config.filter_substring = args.filter_substring
+        # test_repo_path на этом этапе не используется и остаётся None
+        config.work_mode = config.work_mode or 'online'
 
         # Валидация конфигурации
         errors = config.validate()
@@ -325,15 +471,16 @@ class DependencyVisualizer:
             print(f"Репозиторий: {config.repository_url}")
             print("-" * 50)
 
-            # Создаем клиент NuGet
-            nuget_client = self.NuGetClient(config.repository_url)
+            # Создаем клиент NuGet (в режиме offline ответы берутся только из кэша)
+            nuget_client = self.CachedNuGetClient(config.repository_url, offline=config.work_mode == 'offline')
 
             # Получаем зависимости
             dependencies = nuget_client.get_package_dependencies(config.package_name)
 
             # Применяем фильтрацию, если указана
             if config.filter_substring:
-                dependencies = [dep for dep in dependencies if config.filter_substring.lower() in dep.lower()]
+                needle = config.filter_substring.lower()
+                dependencies = [dep for dep in dependencies if needle in dep.lower()]
 
             return dependencies
 
@@ -347,13 +494,11 @@ class DependencyVisualizer:
             print(f"Пакет '{package_name}' не имеет прямых зависимостей.")
             return
 
-        print(f"Прямые зависимости пакета '{package_name}':")
-        print("-" * 40)
-
-        for i, dep in enumerate(sorted(dependencies), 1):
-            print(f"{i:2d}. {dep}")
-
-        print(f"\nВсего найдено зависимостей: {len(dependencies)}")
+        # Список уже отсортирован в parse_nuspec_dependencies; вывод одной записью
+        lines = [f"Прямые зависимости пакета '{package_name}':", "-" * 40]
+        lines.extend(f"{i:2d}. {dep}" for i, dep in enumerate(dependencies, 1))
+        lines.append(f"\nВсего найдено зависимостей: {len(dependencies)}\n")
+        sys.stdout.write("\n".join(lines))
 
     def run(self):
         """Основной метод запуска приложения"""
@@ -361,6 +506,11 @@ class DependencyVisualizer:
             print("Инструмент визуализации графа зависимостей")
             print("Этап 2: Сбор данных для NuGet пакетов\n")
 
+            # Запрос справки: только вывод help, без создания и валидации конфигурации
+            if any(arg in ('-h', '--help') for arg in sys.argv[1:]):
+                _build_parser().parse_args()
+                return
+
             # Создание и валидация конфигурации
             self.config = self.create_config()
 
@@ -388,6 +538,83 @@ class DependencyVisualizer:
             sys.exit(1)
 
 
+@functools.lru_cache(maxsize=1)
+def _build_parser():
+    """Построение парсера аргументов командной строки (один раз на процесс)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Инструмент визуализации графа зависимостей пакетов (NuGet)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Примеры использования:
+  python comit_1.py --package Newtonsoft.Json --url https://api.nuget.org/v3/index.json
+  python comit_1.py --package Newtonsoft.Json --url https://api.nuget.org/v3/index.json --max-depth 3
+  python comit_1.py --package Microsoft.Extensions.Logging --url https://api.nuget.org/v3/index.json --filter "Extensions"
+
+Обязательные параметры:
+  --package и --url должны быть указаны всегда.
+  --mode offline использует только ранее загруженные ответы из кэша.
+        '''
+    )
+
+    # Обязательные параметры
+    parser.add_argument(
+        '--package',
+        dest='package_name',
+        required=True,
+        type=str,
+        help='Имя анализируемого пакета NuGet (обязательно)'
+    )
+
+    # Источники данных
+    parser.add_argument(
+        '--url',
+        dest='repository_url',
+        type=str,
+        required=True,
+        help='URL-адрес NuGet репозитория (например, https://api.nuget.org/v3/index.json)'
+    )
+
+    # Опциональные параметры
+    parser.add_argument(
+        '--mode',
+        dest='work_mode',
+        choices=_WORK_MODES,
+        help='Режим работы: online (по умолчанию) или offline'
+    )
+
+    parser.add_argument(
+        '--max-depth',
+        dest='max_depth',
+        type=int,
+        help='Максимальная глубина анализа зависимостей (положительное целое число)'
+    )
+
+    parser.add_argument(
+        '--filter',
+        dest='filter_substring',
+        type=str,
+        help='Подстрока для фильтрации пакетов по имени'
+    )
+
+    return parser
+
+
+@functools.lru_cache(maxsize=128)
+def _validate_tuple(package_name, repository_url, test_repo_path, work_mode, max_depth, filter_substring,
+                    test_repo_mtime):
+    """Валидация набора параметров с кэшированием результата.
+
+    test_repo_mtime входит в ключ кэша: изменение тестового репозитория
+    на диске приводит к повторной проверке."""
+    config = DependencyVisualizer.Config()
+    values = (package_name, repository_url, test_repo_path, work_mode, max_depth, filter_substring)
+    for name, value in zip(config.__slots__, values):
+        setattr(config, name, value)
+    return tuple(config.collect_errors())
+
+
 def main():
     """Точка входа в приложение"""
     visualizer = DependencyVisualizer()
@@ -5,6 +5,9 @@
 """
 
 import argparse
+import array
+import functools
+import hashlib
 import sys
 import os
 import xml.etree.ElementTree as ET
@@ -12,24 +15,123 @@ from urllib.request import urlopen, Request
 from urllib.error import HTTPError, URLError
 import json
 from collections import deque, defaultdict
-import re
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+
+@functools.lru_cache(maxsize=None)
+def _nuspec_tags(root_tag):
+    """Полные имена тегов .nuspec в namespace корневого элемента: (metadata, id, dependency, dependencies)"""
+    head, sep, _ = root_tag.rpartition('}')
+    namespace = head + sep
+    return tuple(namespace + name for name in ('metadata', 'id', 'dependency', 'dependencies'))
+
+
+def _config_template(labels):
+    """Шаблон вывода конфигурации: строка "  подпись : {}" на каждый параметр, подписи выровнены"""
+    width = max(map(len, labels))
+    return "Текущая конфигурация:\n" + "".join(f"  {label:<{width}} : {{}}\n" for label in labels)
+
+
+def _iter_nuspecs(root):
+    """Обход директории с выдачей путей .nuspec файлов (включая поддиректории).
+
+    Как и glob('**/*.nuspec', recursive=True): скрытые файлы и директории пропускаются,
+    символические ссылки на директории обходятся (каждая директория - один раз)."""
+    root_stat = os.stat(root)
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    # Ссылка на уже пройденную директорию не дает зациклиться
+                    stat = entry.stat()
+                    key = (stat.st_dev, stat.st_ino)
+                    if key not in visited:
+                        visited.add(key)
+                        stack.append(entry.path)
+                elif entry.name.endswith('.nuspec') and entry.is_file():
+                    # Тип записи известен из readdir, отдельный stat не нужен
+                    yield entry.path
+
+
+def _build_reverse_csr(adjacency):
+    """Построение обратного графа в CSR-представлении (массивы номеров вершин).
+
+    Возвращает (имена, {имя: номер}, offsets, edges): пакеты, зависящие от
+    вершины i - edges[offsets[i]:offsets[i + 1]]."""
+    index = {}
+    forward = []
+    for package, dependencies in adjacency.items():
+        source = index.setdefault(package, len(index))
+        # Повторы одной зависимости у пакета дают одну обратную связь
+        forward.append((source, [index.setdefault(dep, len(index)) for dep in dict.fromkeys(dependencies)]))
+
+    # Проход 1: число входящих связей каждой вершины -> смещения
+    offsets = array.array('i', [0]) * (len(index) + 1)
+    for _, targets in forward:
+        for target in targets:
+            offsets[target + 1] += 1
+    for i in range(len(index)):
+        offsets[i + 1] += offsets[i]
+
+    # Проход 2: раскладка источников по корзинам вершин в исходном порядке
+    edges = array.array('i', [0]) * offsets[-1]
+    cursor = offsets[:-1]
+    for source, targets in forward:
+        for target in targets:
+            edges[cursor[target]] = source
+            cursor[target] += 1
+
+    return tuple(index), index, offsets, edges
 
 
 class DependencyVisualizer:
     """Основной класс для визуализации графа зависимостей"""
 
+    # Число параллельных запросов к NuGet в онлайн режиме
+    MAX_WORKERS = 16
+
+    # Сколько имен пакетов одного уровня выводится без --verbose
+    MAX_SHOWN_PACKAGES = 20
+
+    # Без __dict__ у экземпляров: атрибуты хранятся в фиксированных слотах
+    __slots__ = ('config', 'dependency_graph', '_reverse_names', '_reverse_index', '_reverse_offsets',
+                 '_reverse_edges', 'cycle_detected', 'operation_mode', '_source', '_repo_type',
+                 '_complete_graph', '_graph_sig', '_executor', '_prefetch', '_level_cache',
+                 'reverse_graph', 'cycles', '_skip_package')
+
     def __init__(self):
         self.config = None
-        self.dependency_graph = defaultdict(list)
-        self.reverse_dependency_graph = defaultdict(list)
-        self.visited_packages = set()
+        # Пакет -> кортеж его зависимостей (после загрузки список не меняется)
+        self.dependency_graph = {}
+        # Обратный граф в CSR-представлении (см. _build_reverse_csr)
+        self._reverse_names = ()
+        self._reverse_index = {}
+        self._reverse_offsets = None
+        self._reverse_edges = None
         self.cycle_detected = False
         self.operation_mode = 'forward'  # 'forward' или 'reverse'
+        self._source = None  # NuGetClient, OfflineNuGetRepository или TestRepository
+        self._repo_type = None
+        self._complete_graph = None  # прямые связи всех пакетов оффлайн репозитория
+        self._graph_sig = None  # снимок репозитория, по которому построен обратный индекс
+        self._executor = None
+        self._prefetch = {}  # имя пакета -> Future с его зависимостями
+        self._level_cache = {}  # имя пакета -> уровень зависимости
+        self.reverse_graph = {}  # пакет -> множество пакетов dependency_graph, которые на него ссылаются
+        self.cycles = []  # обратные ребра (пакет, зависимость), найденные при вычислении уровней
+        self._skip_package = self.should_skip_package  # предикат фильтра, уточняется в create_config
 
     class Config:
         """Класс для хранения и валидации конфигурационных параметров"""
 
+        # Без __dict__ у экземпляров: меньше памяти и быстрее доступ к атрибутам
+        __slots__ = ('package_name', 'repository_url', 'test_repo_path', 'work_mode', 'max_depth',
+                     'filter_substring', 'reverse_mode', 'profile', 'verbose')
+
         def __init__(self):
             self.package_name = None
             self.repository_url = None
@@ -38,6 +140,8 @@ class DependencyVisualizer:
             self.max_depth = None
             self.filter_substring = None
             self.reverse_mode = False
+            self.profile = False
+            self.verbose = False
 
         def validate(self):
             """Валидация параметров конфигурации"""
@@ -98,33 +202,35 @@ class DependencyVisualizer:
 
             return errors
 
+        # Подписи параметров статичны: шаблон вывода собирается один раз при импорте
+        _STR_TEMPLATE = _config_template((
+            "Имя анализируемого пакета",
+            "URL репозитория",
+            "Путь к тестовому репозиторию",
+            "Режим работы",
+            "Максимальная глубина анализа",
+            "Подстрока для фильтрации",
+            "Режим обратных зависимостей"
+        ))
+
         def __str__(self):
             """Строковое представление конфигурации в формате ключ-значение"""
-            config_items = [
-                ("package_name", "Имя анализируемого пакета", self.package_name),
-                ("repository_url", "URL репозитория", self.repository_url),
-                ("test_repo_path", "Путь к тестовому репозиторию", self.test_repo_path),
-                ("work_mode", "Режим работы", self.work_mode),
-                ("max_depth", "Максимальная глубина анализа", self.max_depth),
-                ("filter_substring", "Подстрока для фильтрации", self.filter_substring),
-                ("reverse_mode", "Режим обратных зависимостей", "включен" if self.reverse_mode else "выключен")
-            ]
-
-            result = "Текущая конфигурация:\n"
-            max_key_length = max(len(key) for _, key, _ in config_items)
-
-            for _, key, value in config_items:
-                display_value = value if value is not None else 'не указано'
-                result += f"  {key:<{max_key_length}} : {display_value}\n"
-
-            return result
+            values = (self.package_name, self.repository_url, self.test_repo_path, self.work_mode,
+                      self.max_depth, self.filter_substring)
+            return self._STR_TEMPLATE.format(*[value if value is not None else 'не указано' for value in values],
+                                             "включен" if self.reverse_mode else "выключен")
 
     class NuGetClient:
         """Клиент для работы с NuGet репозиторием"""
 
+        __slots__ = ('base_url', 'services', '_versions_cache', '_deps_cache')
+
         def __init__(self, base_url):
             self.base_url = base_url.rstrip('/')
             self.services = {}
+            # Кэши ответов: один пакет часто встречается в графе как транзитивная зависимость многих
+            self._versions_cache = {}  # имя пакета (lower) -> список версий
+            self._deps_cache = {}  # (имя пакета (lower), версия или "") -> список зависимостей
 
         def get_service_url(self, service_type="PackageBaseAddress/3.0.0"):
             """Получение URL сервиса из service index"""
@@ -135,7 +241,7 @@ class DependencyVisualizer:
                     request = Request(service_index_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
 
                     with urlopen(request) as response:
-                        data = json.loads(response.read().decode())
+                        data = json.load(response)
 
                     # Кэшируем сервисы
                     for resource in data.get('resources', []):
@@ -147,6 +253,10 @@ class DependencyVisualizer:
 
         def get_package_versions(self, package_name):
             """Получение списка версий пакета"""
+            cache_key = package_name.lower()
+            if cache_key in self._versions_cache:
+                return self._versions_cache[cache_key]
+
             try:
                 service_url = self.get_service_url()
                 if not service_url:
@@ -156,9 +266,10 @@ class DependencyVisualizer:
                 request = Request(package_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
 
                 with urlopen(request) as response:
-                    data = json.loads(response.read().decode())
+                    data = json.load(response)
 
-                return data.get('versions', [])
+                versions = self._versions_cache[cache_key] = data.get('versions', [])
+                return versions
             except HTTPError as e:
                 if e.code == 404:
                     raise Exception(f"Пакет '{package_name}' не найден в репозитории")
@@ -169,6 +280,10 @@ class DependencyVisualizer:
 
         def get_package_dependencies(self, package_name, version=None):
             """Получение зависимостей пакета"""
+            cache_key = (package_name.lower(), version or "")
+            if cache_key in self._deps_cache:
+                return self._deps_cache[cache_key]
+
             try:
                 if not version:
                     versions = self.get_package_versions(package_name)
@@ -183,7 +298,8 @@ class DependencyVisualizer:
                 with urlopen(request) as response:
                     nuspec_content = response.read().decode()
 
-                return self.parse_nuspec_dependencies(nuspec_content)
+                dependencies = self._deps_cache[cache_key] = self.parse_nuspec_dependencies(nuspec_content)
+                return dependencies
 
             except HTTPError as e:
                 if e.code == 404:
@@ -198,31 +314,13 @@ class DependencyVisualizer:
             try:
                 root = ET.fromstring(nuspec_content)
 
-                # Находим namespace
-                ns = {'ns': root.tag.split('}')[0].strip('{')} if '}' in root.tag else {'ns': ''}
-
-                # Ищем зависимости
-                dependencies = []
-                metadata = root.find('ns:metadata', ns) if ns['ns'] else root.find('metadata')
+                # Полное имя тега берется из namespace документа, отбор элементов делает iter() на C
+                # Дубликаты (одна зависимость в разных группах) отсеиваются сразу множеством
+                dependency_tag = _nuspec_tags(root.tag)[2]
+                dependencies = {sys.intern(dep_id) for elem in root.iter(dependency_tag)
+                                if (dep_id := elem.get('id'))}
 
-                if metadata is not None:
-                    deps_element = metadata.find('ns:dependencies', ns) if ns['ns'] else metadata.find('dependencies')
-                    if deps_element is not None:
-                        for group in deps_element.findall('ns:group', ns) if ns['ns'] else deps_element.findall(
-                                'group'):
-                            for dep in group.findall('ns:dependency', ns) if ns['ns'] else group.findall('dependency'):
-                                dep_id = dep.get('id')
-                                if dep_id:
-                                    dependencies.append(dep_id)
-
-                        # Также проверяем зависимости без группы
-                        for dep in deps_element.findall('ns:dependency', ns) if ns['ns'] else deps_element.findall(
-                                'dependency'):
-                            dep_id = dep.get('id')
-                            if dep_id:
-                                dependencies.append(dep_id)
-
-                return list(set(dependencies))  # Убираем дубликаты
+                return dependencies
 
             except ET.ParseError as e:
                 raise Exception(f"Ошибка парсинга .nuspec файла: {e}")
@@ -232,6 +330,8 @@ class DependencyVisualizer:
     class OfflineNuGetRepository:
         """Класс для работы с оффлайн NuGet репозиторием"""
 
+        __slots__ = ('repo_path', 'packages')
+
         def __init__(self, repo_path):
             self.repo_path = repo_path
             self.packages = {}
@@ -241,17 +341,25 @@ class DependencyVisualizer:
             """Загрузка оффлайн репозитория из .nuspec файлов"""
             try:
                 # Ищем все .nuspec файлы в директории и поддиректориях
-                nuspec_files = glob.glob(os.path.join(self.repo_path, "**", "*.nuspec"), recursive=True)
+                nuspec_files = list(_iter_nuspecs(self.repo_path))
 
                 if not nuspec_files:
                     raise Exception(f"Не найдены .nuspec файлы в {self.repo_path}")
 
+                # Разбор expat держит GIL, поэтому файлы разбираются последовательно
+                errors = []
                 for nuspec_file in nuspec_files:
                     try:
                         package_name, dependencies = self.parse_nuspec_file(nuspec_file)
-                        self.packages[package_name] = dependencies
                     except Exception as e:
-                        print(f"Ошибка загрузки {nuspec_file}: {e}")
+                        errors.append((nuspec_file, e))
+                    else:
+                        self.packages[package_name] = dependencies
+
+                # Одна сводная строка вместо сообщения на каждый поврежденный файл
+                if errors:
+                    first_file, first_error = errors[0]
+                    print(f"Не удалось загрузить .nuspec файлов: {len(errors)} (первая ошибка: {first_file}: {first_error})")
 
                 if not self.packages:
                     raise Exception("Не удалось загрузить ни одного пакета из .nuspec файлов")
@@ -264,42 +372,30 @@ class DependencyVisualizer:
         def parse_nuspec_file(self, file_path):
             """Парсинг .nuspec файла"""
             try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
+                root = ET.parse(file_path).getroot()
 
-                # Находим namespace
-                ns = {'ns': root.tag.split('}')[0].strip('{')} if '}' in root.tag else {'ns': ''}
+                # Теги сравниваются с полными именами в namespace корня
+                metadata_tag, id_tag, dependency_tag, dependencies_tag = _nuspec_tags(root.tag)
 
-                # Получаем имя пакета
-                metadata = root.find('ns:metadata', ns) if ns['ns'] else root.find('metadata')
+                # Получаем имя пакета (порядок дочерних элементов metadata не важен)
+                metadata = root.find(metadata_tag)
                 if metadata is None:
                     raise Exception("Метаданные не найдены")
 
-                package_id = metadata.find('ns:id', ns) if ns['ns'] else metadata.find('id')
-                if package_id is None:
+                package_id = metadata.find(id_tag)
+                if package_id is None or package_id.text is None:
                     raise Exception("ID пакета не найден")
 
-                package_name = package_id.text
-
-                # Ищем зависимости
-                dependencies = []
-                deps_element = metadata.find('ns:dependencies', ns) if ns['ns'] else metadata.find('dependencies')
-
+                # Зависимости без группы и внутри групп <group>
+                dependencies = set()
+                deps_element = metadata.find(dependencies_tag)
                 if deps_element is not None:
-                    for group in deps_element.findall('ns:group', ns) if ns['ns'] else deps_element.findall('group'):
-                        for dep in group.findall('ns:dependency', ns) if ns['ns'] else group.findall('dependency'):
-                            dep_id = dep.get('id')
-                            if dep_id:
-                                dependencies.append(dep_id)
-
-                    # Также проверяем зависимости без группы
-                    for dep in deps_element.findall('ns:dependency', ns) if ns['ns'] else deps_element.findall(
-                            'dependency'):
+                    for dep in deps_element.iter(dependency_tag):
                         dep_id = dep.get('id')
                         if dep_id:
-                            dependencies.append(dep_id)
+                            dependencies.add(sys.intern(dep_id))
 
-                return package_name, list(set(dependencies))
+                return sys.intern(package_id.text), dependencies
 
             except ET.ParseError as e:
                 raise Exception(f"Ошибка парсинга XML: {e}")
@@ -317,6 +413,8 @@ class DependencyVisualizer:
     class TestRepository:
         """Класс для работы с тестовым репозиторием (A->B C формат)"""
 
+        __slots__ = ('file_path', 'dependency_graph')
+
         def __init__(self, file_path):
             self.file_path = file_path
             self.dependency_graph = {}
@@ -328,16 +426,12 @@ class DependencyVisualizer:
                 with open(self.file_path, 'r', encoding='utf-8') as f:
                     content = f.read().strip()
 
-                # Парсим зависимости в формате: A -> B C D
-                lines = content.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if '->' in line:
-                        parts = line.split('->')
-                        if len(parts) == 2:
-                            package = parts[0].strip()
-                            dependencies = [dep.strip() for dep in parts[1].split() if dep.strip()]
-                            self.dependency_graph[package] = dependencies
+                # Парсим зависимости в формате: A -> B C D (одно сопоставление на строку)
+                for line in content.splitlines():
+                    # Строка вида "A -> B C" содержит ровно одну стрелку
+                    if line.count('->') == 1:
+                        package, _, dependencies = line.partition('->')
+                        self.dependency_graph[sys.intern(package.strip())] = tuple(map(sys.intern, dependencies.split()))
 
                 if not self.dependency_graph:
                     raise Exception("Тестовый репозиторий не содержит корректных данных")
@@ -448,6 +542,20 @@ class DependencyVisualizer:
             help='Режим обратных зависимостей (показывает кто зависит от данного пакета)'
         )
 
+        parser.add_argument(
+            '--profile',
+            dest='profile',
+            action='store_true',
+            help='Профилирование анализа (cProfile): вывод 20 самых затратных функций'
+        )
+
+        parser.add_argument(
+            '--verbose',
+            dest='verbose',
+            action='store_true',
+            help='Полные списки пакетов по уровням (по умолчанию выводятся первые 20 имен уровня)'
+        )
+
         return parser.parse_args()
 
     def create_config(self):
@@ -459,13 +567,16 @@ class DependencyVisualizer:
             sys.exit(1)
 
         config = self.Config()
-        config.package_name = args.package_name
+        # Имена пакетов интернируются, чтобы сравнения в словарях графа шли по ссылке
+        config.package_name = sys.intern(args.package_name)
         config.repository_url = args.repository_url
         config.test_repo_path = args.test_repo_path
         config.work_mode = args.work_mode
         config.max_depth = args.max_depth
         config.filter_substring = args.filter_substring
         config.reverse_mode = args.reverse_mode
+        config.profile = args.profile
+        config.verbose = args.verbose
 
         # Валидация конфигурации
         errors = config.validate()
@@ -476,6 +587,13 @@ class DependencyVisualizer:
             print("\nИспользуйте --help для справки по параметрам")
             sys.exit(1)
 
+        # Предикат фильтра собирается один раз: подстрока приводится к нижнему регистру заранее
+        if config.filter_substring:
+            needle = config.filter_substring.lower()
+            self._skip_package = lambda package_name, _needle=needle: _needle in package_name.lower()
+        else:
+            self._skip_package = lambda package_name: False
+
         return config
 
     def print_error(self, message):
@@ -497,31 +615,129 @@ class DependencyVisualizer:
         if os.path.isfile(repo_path):
             return 'test_format'
         elif os.path.isdir(repo_path):
-            # Проверяем, есть ли .nuspec файлы в директории
-            nuspec_files = glob.glob(os.path.join(repo_path, "**", "*.nuspec"), recursive=True)
-            if nuspec_files:
+            # Достаточно найти первый .nuspec файл, полный список не нужен
+            if next(_iter_nuspecs(repo_path), None) is not None:
                 return 'nuspec_offline'
             else:
                 raise Exception(f"В директории {repo_path} не найдены .nuspec файлы")
         else:
             raise Exception(f"Путь {repo_path} не является файлом или директорией")
 
+    def get_repository_type(self):
+        """Тип оффлайн репозитория (определяется один раз)"""
+        if self._repo_type is None:
+            self._repo_type = self.detect_repository_type(self.config.test_repo_path)
+        return self._repo_type
+
+    def get_source(self):
+        """Источник зависимостей: NuGet клиент или оффлайн репозиторий (выбирается один раз)"""
+        if self._source is None:
+            if self.config.work_mode == 'online':
+                self._source = self.NuGetClient(self.config.repository_url)
+            elif self.get_repository_type() == 'nuspec_offline':
+                self._source = self.OfflineNuGetRepository(self.config.test_repo_path)
+            else:  # test_format
+                self._source = self.TestRepository(self.config.test_repo_path)
+        return self._source
+
+    def get_complete_graph(self):
+        """Прямые связи всех пакетов оффлайн репозитория"""
+        if self._complete_graph is None:
+            source = self.get_source()
+            if self.get_repository_type() == 'nuspec_offline':
+                self._complete_graph = source.packages
+            else:  # test_format
+                self._complete_graph = source.dependency_graph
+        return self._complete_graph
+
+    def repository_signature(self):
+        """Снимок оффлайн репозитория: [путь, mtime_ns, размер] каждого файла с описанием пакетов"""
+        repo_path = self.config.test_repo_path
+        if self.get_repository_type() == 'nuspec_offline':
+            files = sorted(_iter_nuspecs(repo_path))
+        else:  # test_format
+            files = [repo_path]
+
+        signature = []
+        for path in files:
+            stat = os.stat(path)
+            signature.append([path, stat.st_mtime_ns, stat.st_size])
+        return signature
+
+    def graph_cache_path(self):
+        """Файл кэша полного графа для текущего репозитория (каталог кэша по спецификации XDG)"""
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        key = hashlib.sha1(os.path.abspath(self.config.test_repo_path).encode('utf-8')).hexdigest()
+        return os.path.join(cache_home, 'dependency_visualizer', f"graph-{key}.json")
+
+    def load_cached_graph(self, signature):
+        """Полный граф из кэша, если репозиторий не менялся с момента его сохранения, иначе None"""
+        try:
+            with open(self.graph_cache_path(), 'rb') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(cached, dict) or cached.get('signature') != signature:
+            return None
+
+        # Поврежденный или чужой файл кэша не прерывает анализ: граф просто строится заново
+        graph = cached.get('graph')
+        if not isinstance(graph, dict):
+            return None
+        complete_graph = {}
+        for package, dependencies in graph.items():
+            if not isinstance(dependencies, list) or not all(isinstance(dep, str) for dep in dependencies):
+                return None
+            complete_graph[sys.intern(package)] = tuple(map(sys.intern, dependencies))
+        return complete_graph
+
+    def save_cached_graph(self, signature, graph):
+        """Атомарное сохранение полного графа в кэш; ошибки записи не мешают анализу"""
+        cache_path = self.graph_cache_path()
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'signature': signature,
+                           'graph': {package: list(dependencies) for package, dependencies in graph.items()}},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def check_package_in_repository(self, package_name):
+        """Завершение работы, если пакет не встречается в оффлайн репозитории ни как пакет, ни как зависимость"""
+        complete_graph = self.get_complete_graph()
+        if package_name in complete_graph:
+            return
+        if any(package_name in dependencies for dependencies in complete_graph.values()):
+            return
+
+        self.print_error(f"Пакет '{package_name}' не найден в репозитории {self.config.test_repo_path}")
+        sys.exit(1)
+
+    def prefetch_dependencies(self, packages):
+        """Фоновая загрузка зависимостей пакетов, которые обход посетит следующими"""
+        for package in packages:
+            if package not in self._prefetch and not self._skip_package(package):
+                self._prefetch[package] = self._executor.submit(
+                    self._source.get_package_dependencies, package)
+
     def get_dependencies(self, package_name):
-        """Получение зависимостей пакета в зависимости от режима и типа репозитория"""
+        """Получение зависимостей пакета из выбранного источника"""
         try:
-            if self.config.work_mode == 'online':
-                nuget_client = self.NuGetClient(self.config.repository_url)
-                return nuget_client.get_package_dependencies(package_name)
-            else:
-                # Определяем тип оффлайн репозитория
-                repo_type = self.detect_repository_type(self.config.test_repo_path)
+            # Источник создается один раз и переиспользуется для всех пакетов
+            source = self.get_source()
 
-                if repo_type == 'nuspec_offline':
-                    offline_repo = self.OfflineNuGetRepository(self.config.test_repo_path)
-                    return offline_repo.get_package_dependencies(package_name)
-                else:  # test_format
-                    test_repo = self.TestRepository(self.config.test_repo_path)
-                    return test_repo.get_package_dependencies(package_name)
+            # В онлайн режиме зависимости могли быть уже загружены заранее в фоновом потоке
+            future = self._prefetch.get(package_name)
+            if future is not None:
+                return future.result()
+            return source.get_package_dependencies(package_name)
 
         except Exception as e:
             print(f"Ошибка получения зависимостей для {package_name}: {e}")
@@ -536,119 +752,136 @@ class DependencyVisualizer:
                 # Для онлайн режима невозможно построить полный граф
                 raise Exception("Обратные зависимости недоступны в онлайн режиме. Используйте тестовый репозиторий.")
             else:
-                repo_type = self.detect_repository_type(self.config.test_repo_path)
-
-                if repo_type == 'nuspec_offline':
-                    offline_repo = self.OfflineNuGetRepository(self.config.test_repo_path)
-                    all_packages = offline_repo.get_all_packages()
-
-                    # Строим полный граф зависимостей
-                    for package in all_packages:
-                        dependencies = offline_repo.get_package_dependencies(package)
-                        self.dependency_graph[package] = dependencies
-
-                        # Строим обратный граф
-                        for dep in dependencies:
-                            self.reverse_dependency_graph[dep].append(package)
+                # Обратный индекс уже построен для этого состояния репозитория
+                signature = self.repository_signature()
+                if signature == self._graph_sig:
+                    print("Граф уже построен: репозиторий не изменился")
+                    return
+
+                # Прямые связи всего репозитория нужны только для обратного индекса;
+                # в dependency_graph попадут лишь пакеты, достижимые при обходе.
+                # Если файлы репозитория не менялись, граф берется из кэша без разбора файлов
+                complete_graph = self.load_cached_graph(signature)
+                if complete_graph is not None:
+                    self._complete_graph = complete_graph
+                    print("Полный граф загружен из кэша: репозиторий не изменился")
+                else:
+                    complete_graph = self.get_complete_graph()
+                    self.save_cached_graph(signature, complete_graph)
 
-                else:  # test_format
-                    test_repo = self.TestRepository(self.config.test_repo_path)
-                    self.dependency_graph = test_repo.dependency_graph
+                # Отсутствующий пакет не требует построения обратного индекса
+                self.check_package_in_repository(self.config.package_name)
 
-                    # Строим обратный граф
-                    for package, dependencies in self.dependency_graph.items():
-                        for dep in dependencies:
-                            self.reverse_dependency_graph[dep].append(package)
+            # Обратный граф строится за два прохода по всем связям
+            (self._reverse_names, self._reverse_index,
+             self._reverse_offsets, self._reverse_edges) = _build_reverse_csr(complete_graph)
+            self._graph_sig = signature
 
             print(
-                f"Граф построен: {len(self.dependency_graph)} пакетов, {sum(len(deps) for deps in self.reverse_dependency_graph.values())} обратных связей")
+                f"Граф построен: {len(complete_graph)} пакетов, {len(self._reverse_edges)} обратных связей")
 
         except Exception as e:
             raise Exception(f"Ошибка построения графа: {e}")
 
-    def bfs_build_dependency_graph(self, start_package, current_depth=0, path=None):
-        """Построение графа зависимостей с помощью BFS с рекурсией"""
-        if path is None:
-            path = []
-
-        # Проверка максимальной глубины
-        if self.config.max_depth and current_depth >= self.config.max_depth:
-            return
-
-        # Проверка циклических зависимостей
-        if start_package in path:
-            print(f"Обнаружена циклическая зависимость: {' -> '.join(path + [start_package])}")
-            self.cycle_detected = True
+    def bfs_build_dependency_graph(self, start_package):
+        """Построение графа прямых зависимостей итеративным обходом"""
+        if self.config.work_mode != 'online':
+            self.check_package_in_repository(start_package)
+            self.traverse_dependency_graph(start_package, self.get_dependencies)
             return
 
-        # Проверка фильтрации
-        if self.should_skip_package(start_package):
-            print(f"Пропущен пакет '{start_package}' (фильтр: '{self.config.filter_substring}')")
-            return
-
-        # Если пакет уже посещен на этом уровне, пропускаем
-        if start_package in self.visited_packages:
-            return
-
-        self.visited_packages.add(start_package)
-
-        print(f"{'  ' * current_depth}Анализ пакета: {start_package} (глубина: {current_depth})")
-
-        try:
-            # Получение зависимостей
-            dependencies = self.get_dependencies(start_package)
-
-            # Добавляем зависимости в граф
-            self.dependency_graph[start_package] = dependencies
-
-            # Рекурсивный анализ зависимостей
+        # В онлайн режиме зависимости дочерних пакетов запрашиваются параллельно,
+        # пока обход разбирает текущий пакет; порядок вывода не меняется
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            self._executor = executor
+            try:
+                self.traverse_dependency_graph(start_package, self.get_dependencies, self.prefetch_dependencies)
+            finally:
+                self._executor = None
+                self._prefetch = {}
+
+    def bfs_build_reverse_dependency_graph(self, start_package):
+        """Построение графа ОБРАТНЫХ зависимостей итеративным обходом"""
+        self.traverse_dependency_graph(
+            start_package, self.reverse_neighbors)
+
+    def reverse_neighbors(self, package):
+        """Пакеты, которые напрямую зависят от данного"""
+        i = self._reverse_index.get(package)
+        if i is None:
+            return ()
+        names = self._reverse_names
+        return tuple(names[j] for j in self._reverse_edges[self._reverse_offsets[i]:self._reverse_offsets[i + 1]])
+
+    def index_reverse_graph(self):
+        """Построение обратного индекса построенного графа: кто ссылается на каждый пакет"""
+        reverse_graph = {}
+        for package, dependencies in self.dependency_graph.items():
             for dep in dependencies:
-                self.bfs_build_dependency_graph(dep, current_depth + 1, path + [start_package])
-
-        except Exception as e:
-            print(f"{'  ' * current_depth}Ошибка при анализе пакета {start_package}: {e}")
-
-    def bfs_build_reverse_dependency_graph(self, start_package, current_depth=0, path=None):
-        """Построение графа ОБРАТНЫХ зависимостей с помощью BFS с рекурсией"""
-        if path is None:
-            path = []
-
-        # Проверка максимальной глубины
-        if self.config.max_depth and current_depth >= self.config.max_depth:
-            return
-
-        # Проверка циклических зависимостей
-        if start_package in path:
-            print(f"Обнаружена циклическая зависимость: {' -> '.join(path + [start_package])}")
-            self.cycle_detected = True
-            return
+                reverse_graph.setdefault(dep, set()).add(package)
+        self.reverse_graph = reverse_graph
+
+    def traverse_dependency_graph(self, start_package, get_children, prefetch=None):
+        """Итеративный обход в глубину с цветовой маркировкой вершин (серый - на пути, черный - обработан)"""
+        GRAY, BLACK = 1, 2
+        color = {}
+        max_depth = self.config.max_depth
+
+        # Текущий путь и итераторы по детям каждого пакета пути (вместо рекурсии)
+        path = []
+        child_iters = []
+        pending = iter((start_package,))
+
+        while True:
+            package = next(pending, None)
+            if package is None:
+                if not path:
+                    break
+                # Все дети обработаны - пакет становится черным
+                color[path.pop()] = BLACK
+                child_iters.pop()
+                pending = child_iters[-1] if child_iters else iter(())
+                continue
+
+            current_depth = len(path)
 
-        # Проверка фильтрации
-        if self.should_skip_package(start_package):
-            print(f"Пропущен пакет '{start_package}' (фильтр: '{self.config.filter_substring}')")
-            return
+            # Проверка максимальной глубины
+            if max_depth and current_depth >= max_depth:
+                continue
 
-        # Если пакет уже посещен на этом уровне, пропускаем
-        if start_package in self.visited_packages:
-            return
+            # Серый пакет уже на текущем пути - найден цикл
+            state = color.get(package)
+            if state == GRAY:
+                print(f"Обнаружена циклическая зависимость: {' -> '.join(path + [package])}")
+                self.cycle_detected = True
+                continue
 
-        self.visited_packages.add(start_package)
+            # Проверка фильтрации
+            if self._skip_package(package):
+                print(f"Пропущен пакет '{package}' (фильтр: '{self.config.filter_substring}')")
+                continue
 
-        print(f"{'  ' * current_depth}Анализ пакета: {start_package} (глубина: {current_depth})")
+            # Черный пакет уже полностью обработан
+            if state == BLACK:
+                continue
 
-        try:
-            # Получаем пакеты, которые зависят от текущего
-            dependents = self.reverse_dependency_graph.get(start_package, [])
+            print(f"{'  ' * current_depth}Анализ пакета: {package} (глубина: {current_depth})")
 
-            # Добавляем в граф (в обратном направлении)
-            self.dependency_graph[start_package] = dependents
+            try:
+                children = self.dependency_graph[package] = tuple(get_children(package))
+            except Exception as e:
+                print(f"{'  ' * current_depth}Ошибка при анализе пакета {package}: {e}")
+                color[package] = BLACK
+                continue
 
-            # Рекурсивный анализ обратных зависимостей
-            for dependent in dependents:
-                self.bfs_build_reverse_dependency_graph(dependent, current_depth + 1, path + [start_package])
+            # Упреждающая загрузка детей, которые еще попадут в пределы глубины
+            if prefetch is not None and not (max_depth and current_depth + 1 >= max_depth):
+                prefetch(children)
 
-        except Exception as e:
-            print(f"{'  ' * current_depth}Ошибка при анализе пакета {start_package}: {e}")
+            color[package] = GRAY
+            path.append(package)
+            pending = iter(children)
+            child_iters.append(pending)
 
     def display_dependency_graph(self):
         """Отображение построенного графа зависимостей"""
@@ -656,125 +889,229 @@ class DependencyVisualizer:
             print("Граф зависимостей пуст.")
             return
 
-        print("\n" + "=" * 60)
-        if self.config.reverse_mode:
-            print("ГРАФ ОБРАТНЫХ ЗАВИСИМОСТЕЙ")
+        reverse_mode = self.config.reverse_mode
+        if reverse_mode:
+            # Для обратных зависимостей показываем кто зависит от пакета
+            title, separator, empty = "ГРАФ ОБРАТНЫХ ЗАВИСИМОСТЕЙ", " <- ", "(никто не зависит)"
         else:
-            print("ГРАФ ПРЯМЫХ ЗАВИСИМОСТЕЙ")
-        print("=" * 60)
-
-        total_dependencies = 0
-        for package, dependencies in sorted(self.dependency_graph.items()):
-            if self.config.reverse_mode:
-                # Для обратных зависимостей показываем кто зависит от пакета
-                deps_str = ", ".join(dependencies) if dependencies else "(никто не зависит)"
-                print(f"{package} <- {deps_str}")
-            else:
-                # Для прямых зависимостей показываем от кого зависит пакет
-                deps_str = ", ".join(dependencies) if dependencies else "(нет зависимостей)"
-                print(f"{package} -> {deps_str}")
-            total_dependencies += len(dependencies)
-
-        print(f"\nСтатистика:")
-        print(f"  Всего пакетов в графе: {len(self.dependency_graph)}")
-        print(f"  Всего связей: {total_dependencies}")
-        print(f"  Максимальная глубина: {self.config.max_depth or 'не ограничена'}")
-        print(f"  Фильтр: '{self.config.filter_substring or 'не применен'}'")
-        print(f"  Режим: {'ОБРАТНЫЕ зависимости' if self.config.reverse_mode else 'прямые зависимости'}")
+            # Для прямых зависимостей показываем от кого зависит пакет
+            title, separator, empty = "ГРАФ ПРЯМЫХ ЗАВИСИМОСТЕЙ", " -> ", "(нет зависимостей)"
+
+        # Отчет собирается целиком и выводится одной записью
+        lines = ["", "=" * 60, title, "=" * 60]
+        lines.extend(f"{package}{separator}{', '.join(dependencies) if dependencies else empty}"
+                     for package, dependencies in sorted(self.dependency_graph.items()))
+
+        lines.append("\nСтатистика:")
+        lines.append(f"  Всего пакетов в графе: {len(self.dependency_graph)}")
+        lines.append(f"  Всего связей: {sum(map(len, self.dependency_graph.values()))}")
+        lines.append(f"  Максимальная глубина: {self.config.max_depth or 'не ограничена'}")
+        lines.append(f"  Фильтр: '{self.config.filter_substring or 'не применен'}'")
+        lines.append(f"  Режим: {'ОБРАТНЫЕ зависимости' if reverse_mode else 'прямые зависимости'}")
 
         if self.cycle_detected:
-            print(f"  Обнаружены циклические зависимости!")
+            lines.append(f"  Обнаружены циклические зависимости!")
+
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def display_detailed_analysis(self):
         """Детальный анализ графа"""
         if not self.dependency_graph:
             return
 
-        print("\n" + "=" * 60)
-        print("ДЕТАЛЬНЫЙ АНАЛИЗ ГРАФА")
-        print("=" * 60)
+        # Раздел собирается целиком и выводится одной записью
+        out = ["", "=" * 60, "ДЕТАЛЬНЫЙ АНАЛИЗ ГРАФА", "=" * 60]
 
         if self.config.reverse_mode:
             start_package = self.config.package_name
             dependents = self.dependency_graph.get(start_package, [])
 
-            print(f"Пакет '{start_package}' используется следующими пакетами:")
+            out.append(f"Пакет '{start_package}' используется следующими пакетами:")
             if dependents:
-                for i, dep in enumerate(sorted(dependents), 1):
-                    print(f"  {i:2d}. {dep}")
+                out.extend(f"  {i:2d}. {dep}" for i, dep in enumerate(sorted(dependents), 1))
             else:
-                print("  (пакет не используется другими пакетами)")
+                out.append("  (пакет не используется другими пакетами)")
         else:
-            # Анализ уровней зависимостей для прямого графа
-            levels = {}
-            for package in self.dependency_graph:
-                level = self.calculate_dependency_level(package)
-                if level not in levels:
-                    levels[level] = []
-                levels[level].append(package)
-
-            print("Распределение по уровням зависимостей:")
-            for level in sorted(levels.keys()):
-                packages = sorted(levels[level])
-                print(f"  Уровень {level}: {', '.join(packages)}")
+            # Анализ уровней зависимостей для прямого графа: все уровни за один проход.
+            # Корзины уровней и список листьев заполняются одним упорядоченным проходом по графу
+            level_of = self._compute_all_levels()
+            # Уровни - небольшие неотрицательные числа, поэтому корзины хранятся в списке по индексу
+            levels = [[] for _ in range(max(level_of.values(), default=-1) + 1)]
+            leaf_packages = []
+            for package, dependencies in sorted(self.dependency_graph.items()):
+                levels[level_of[package]].append(package)
+                if not dependencies:
+                    leaf_packages.append(package)
+
+            out.append("Распределение по уровням зависимостей:")
+            limit = None if self.config.verbose else self.MAX_SHOWN_PACKAGES
+            for level, packages in enumerate(levels):
+                if not packages:
+                    continue
+                # Широкие уровни без --verbose сокращаются до первых имен и числа остальных
+                if limit is not None and len(packages) > limit:
+                    out.append(f"  Уровень {level}: {', '.join(packages[:limit])}, ...(+{len(packages) - limit})")
+                else:
+                    out.append(f"  Уровень {level}: {', '.join(packages)}")
 
             # Пакеты без зависимостей
-            leaf_packages = [pkg for pkg, deps in self.dependency_graph.items() if not deps]
             if leaf_packages:
-                print(f"\nПакеты без зависимостей ({len(leaf_packages)}): {', '.join(sorted(leaf_packages))}")
+                out.append(f"\nПакеты без зависимостей ({len(leaf_packages)}): {', '.join(leaf_packages)}")
+
+            # Ребра, замыкающие циклы, при подсчете уровней пропускаются
+            if self.cycles:
+                back_edges = ", ".join(f"{package} -> {dep}" for package, dep in self.cycles)
+                out.append(f"\nЦиклические зависимости (не учитывались в уровнях): {back_edges}")
+
+        sys.stdout.write("\n".join(out) + "\n")
+
+    def _compute_all_levels(self):
+        """Уровни всех пакетов графа одним проходом от листьев к корням (алгоритм Кана)"""
+        graph = self.dependency_graph
+        # Обратные ссылки нужны только здесь; индекс строится один раз по готовому графу
+        self.index_reverse_graph()
+        parents = self.reverse_graph  # пакет -> пакеты графа, которые от него зависят
+        levels = {}
+        remaining = {}  # пакет -> число детей, уровень которых еще не известен
+        queue = deque()
+
+        for package, dependencies in graph.items():
+            # Обратный индекс хранит каждое ребро один раз, поэтому дети считаются без повторов
+            count = len({dep for dep in dependencies if dep in graph})
+            remaining[package] = count
+            if not count:
+                # Зависимости вне графа не учитываются, но пакет с ними - уже не лист
+                levels[package] = 1 if dependencies else 0
+                queue.append(package)
+
+        candidate = {}  # пакет -> лучший уровень по уже обработанным детям
+        while queue:
+            child = queue.popleft()
+            level = levels[child] + 1
+            for parent in parents.get(child, ()):
+                if candidate.get(parent, 0) < level:
+                    candidate[parent] = level
+                remaining[parent] -= 1
+                if not remaining[parent]:
+                    levels[parent] = candidate[parent]
+                    queue.append(parent)
+
+        # Пакеты на циклах не освобождаются в очереди - их уровни считает обход в глубину,
+        # который заодно собирает обратные ребра циклов
+        self.cycles = []
+        if len(levels) < len(graph):
+            self._level_cache = levels
+            for package in graph:
+                if package not in levels:
+                    self.calculate_dependency_level(package)
+
+        return {package: levels[package] for package in graph}
 
     def calculate_dependency_level(self, package):
-        """Вычисление уровня зависимости пакета"""
-        if not self.dependency_graph[package]:
-            return 0
+        """Вычисление уровня зависимости пакета итеративным обходом в глубину с цветовой маркировкой"""
+        levels = self._level_cache
+        if package in levels:
+            return levels[package]
+
+        GRAY, BLACK = 1, 2
+        color = {}  # серый - зависимости пакета еще обрабатываются, черный - уровень вычислен
+
+        # Атрибуты и методы, нужные в цикле, связываются с локальными именами один раз
+        graph = self.dependency_graph
+        get_level = levels.get
+        get_color = color.get
+        add_cycle = self.cycles.append
+
+        # Каждый пакет попадает в стек дважды: для раскрытия детей и для подсчета уровня после них
+        stack = [(package, False)]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node, children_done = pop()
+            dependencies = graph[node]
+
+            if children_done:
+                # Уровень 0 - нет зависимостей; иначе на единицу выше самого глубокого известного ребенка.
+                # Обратное ребро цикла ведет к пакету без уровня, оно не учитывается
+                if dependencies:
+                    levels[node] = 1 + max((get_level(dep, 0) for dep in dependencies if dep in graph), default=0)
+                else:
+                    levels[node] = 0
+                color[node] = BLACK
+                continue
+
+            if node in levels or get_color(node):
+                continue
 
-        max_child_level = 0
-        for dep in self.dependency_graph[package]:
-            if dep in self.dependency_graph:
-                child_level = self.calculate_dependency_level(dep)
-                max_child_level = max(max_child_level, child_level)
+            color[node] = GRAY
+            push((node, True))
+            for dep in dependencies:
+                if dep not in graph or dep in levels:
+                    continue
+                if get_color(dep) == GRAY:
+                    # Зависимость от пакета на текущем пути - цикл
+                    add_cycle((node, dep))
+                    continue
+                push((dep, False))
+
+        return levels[package]
+
+    def analyze(self):
+        """Построение и вывод графа согласно конфигурации"""
+        # Параметры в формате ключ-значение и заголовок режима выводятся одной записью
+        separator = "=" * 60
+        if self.config.reverse_mode:
+            # РЕЖИМ ОБРАТНЫХ ЗАВИСИМОСТЕЙ
+            sys.stdout.write(f"{self.config}\n\n{separator}\nАНАЛИЗ ОБРАТНЫХ ЗАВИСИМОСТЕЙ\n{separator}\n"
+                             f"Поиск пакетов, которые зависят от: {self.config.package_name}\n")
 
-        return max_child_level + 1
+            # Сначала строим полный граф
+            self.build_complete_dependency_graph()
 
-    def run(self):
-        """Основной метод запуска приложения"""
-        try:
-            print("Инструмент визуализации графа зависимостей")
-            print("Этап 4: Дополнительные операции - обратные зависимости\n")
+            # Затем строим граф обратных зависимостей
+            print(f"\nПостроение графа обратных зависимостей (BFS)...")
+            self.bfs_build_reverse_dependency_graph(self.config.package_name)
 
-            # Создание и валидация конфигурации
-            self.config = self.create_config()
+        else:
+            # РЕЖИМ ПРЯМЫХ ЗАВИСИМОСТЕЙ (предыдущая функциональность)
+            sys.stdout.write(f"{self.config}\n\n{separator}\n"
+                             f"ПОСТРОЕНИЕ ГРАФА ПРЯМЫХ ЗАВИСИМОСТЕЙ (BFS)\n{separator}\n")
 
-            # Вывод всех параметров в формате ключ-значение
-            print(self.config)
+            self.bfs_build_dependency_graph(self.config.package_name)
 
-            if self.config.reverse_mode:
-                # РЕЖИМ ОБРАТНЫХ ЗАВИСИМОСТЕЙ
-                print("\n" + "=" * 60)
-                print("АНАЛИЗ ОБРАТНЫХ ЗАВИСИМОСТЕЙ")
-                print("=" * 60)
-                print(f"Поиск пакетов, которые зависят от: {self.config.package_name}")
+        # Отображение результатов
+        self.display_dependency_graph()
+        self.display_detailed_analysis()
 
-                # Сначала строим полный граф
-                self.build_complete_dependency_graph()
+        self.print_success("Анализ графа зависимостей завершен!")
 
-                # Затем строим граф обратных зависимостей
-                print(f"\nПостроение графа обратных зависимостей (BFS)...")
-                self.bfs_build_reverse_dependency_graph(self.config.package_name)
+    def run_profiled(self, func):
+        """Выполнение функции под cProfile с выводом 20 самых затратных по суммарному времени вызовов"""
+        # Модули профилирования импортируются только при запуске с --profile
+        import cProfile
+        import pstats
 
-            else:
-                # РЕЖИМ ПРЯМЫХ ЗАВИСИМОСТЕЙ (предыдущая функциональность)
-                print("\n" + "=" * 60)
-                print("ПОСТРОЕНИЕ ГРАФА ПРЯМЫХ ЗАВИСИМОСТЕЙ (BFS)")
-                print("=" * 60)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            func()
+        finally:
+            profiler.disable()
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(20)
 
-                self.bfs_build_dependency_graph(self.config.package_name)
+    def run(self):
+        """Основной метод запуска приложения"""
+        try:
+            sys.stdout.write("Инструмент визуализации графа зависимостей\n"
+                             "Этап 4: Дополнительные операции - обратные зависимости\n\n")
 
-            # Отображение результатов
-            self.display_dependency_graph()
-            self.display_detailed_analysis()
+            # Создание и валидация конфигурации
+            self.config = self.create_config()
 
-            self.print_success("Анализ графа зависимостей завершен!")
+            if self.config.profile:
+                self.run_profiled(self.analyze)
+            else:
+                self.analyze()
 
         except KeyboardInterrupt:
             self.print_error("Программа прервана пользователем")
@@ -784,10 +1121,24 @@ class DependencyVisualizer:
             sys.exit(1)
 
 
-def create_sample_nuspec_files():
-    """Создание примеров .nuspec файлов для оффлайн режима"""
-    sample_packages = {
-        'Newtonsoft.Json.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+def write_file_if_changed(filepath, content):
+    """Запись байтов в файл, только если его содержимое отличается; возвращает True, если файл записан"""
+    try:
+        with open(filepath, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    with open(filepath, 'wb') as f:
+        f.write(content)
+    return True
+
+
+# Примеры .nuspec файлов для оффлайн режима; содержимое кодируется один раз при импорте,
+# переводы строк заменяются на платформенные, как при записи в текстовом режиме
+_SAMPLE_NUSPECS = {filename: content.replace('\n', os.linesep).encode('utf-8') for filename, content in {
+    'Newtonsoft.Json.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Newtonsoft.Json</id>
@@ -800,7 +1151,7 @@ def create_sample_nuspec_files():
   </metadata>
 </package>''',
 
-        'Microsoft.Extensions.Logging.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+    'Microsoft.Extensions.Logging.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Microsoft.Extensions.Logging</id>
@@ -818,7 +1169,7 @@ def create_sample_nuspec_files():
   </metadata>
 </package>''',
 
-        'Microsoft.Extensions.DependencyInjection.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+    'Microsoft.Extensions.DependencyInjection.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Microsoft.Extensions.DependencyInjection</id>
@@ -833,7 +1184,7 @@ def create_sample_nuspec_files():
   </metadata>
 </package>''',
 
-        'Microsoft.Extensions.Logging.Abstractions.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+    'Microsoft.Extensions.Logging.Abstractions.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Microsoft.Extensions.Logging.Abstractions</id>
@@ -846,7 +1197,7 @@ def create_sample_nuspec_files():
   </metadata>
 </package>''',
 
-        'Microsoft.Extensions.Options.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+    'Microsoft.Extensions.Options.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Microsoft.Extensions.Options</id>
@@ -862,7 +1213,7 @@ def create_sample_nuspec_files():
   </metadata>
 </package>''',
 
-        'Microsoft.Extensions.DependencyInjection.Abstractions.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
+    'Microsoft.Extensions.DependencyInjection.Abstractions.nuspec': '''<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
   <metadata>
     <id>Microsoft.Extensions.DependencyInjection.Abstractions</id>
@@ -874,20 +1225,21 @@ def create_sample_nuspec_files():
     </dependencies>
   </metadata>
 </package>'''
-    }
+}.items()}
+
 
+def create_sample_nuspec_files():
+    """Создание примеров .nuspec файлов для оффлайн режима"""
     os.makedirs('offline_nuget', exist_ok=True)
-    for filename, content in sample_packages.items():
+    for filename, content in _SAMPLE_NUSPECS.items():
         filepath = os.path.join('offline_nuget', filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"Создан файл: {filepath}")
+        if write_file_if_changed(filepath, content):
+            print(f"Создан файл: {filepath}")
 
 
-def create_test_repository_files():
-    """Создание тестовых файлов репозитория для демонстрации"""
-    test_files = {
-        'simple_test.txt': '''
+# Тестовые репозитории в формате "A -> B C"; содержимое кодируется один раз при импорте
+_TEST_REPOSITORY_FILES = {filename: content.strip().replace('\n', os.linesep).encode('utf-8') for filename, content in {
+    'simple_test.txt': '''
 A -> B C
 B -> D
 C -> D E
@@ -895,7 +1247,7 @@ D ->
 E -> F
 F -> 
 ''',
-        'cycle_test.txt': '''
+    'cycle_test.txt': '''
 A -> B
 B -> C
 C -> A
@@ -903,7 +1255,7 @@ D -> E
 E -> D F
 F -> 
 ''',
-        'complex_test.txt': '''
+    'complex_test.txt': '''
 A -> B C D
 B -> E F
 C -> F G
@@ -921,12 +1273,14 @@ N ->
 O -> 
 P -> 
 '''
-    }
+}.items()}
 
-    for filename, content in test_files.items():
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(content.strip())
-        print(f"Создан тестовый файл: {filename}")
+
+def create_test_repository_files():
+    """Создание тестовых файлов репозитория для демонстрации"""
+    for filename, content in _TEST_REPOSITORY_FILES.items():
+        if write_file_if_changed(filename, content):
+            print(f"Создан тестовый файл: {filename}")
 
 
 def main():